@@ -1,10 +1,11 @@
+import os
+import threading
 import streamlit as st
 import pandas as pd
 import numpy as np
 import joblib
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import xgboost as xgb
+from features import INPUT_KEYS, FEATURE_ORDER, fill_feature_vector, clean_batch, create_feature_matrix
 
 # Configure page
 st.set_page_config(
@@ -15,7 +16,7 @@ st.set_page_config(
 )
 
 # Custom CSS
-st.markdown("""
+_CSS = """
 <style>
     .main-header {
         font-size: 3rem;
@@ -49,47 +50,189 @@ st.markdown("""
         border-left: 4px solid #1f4e79;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# Streamlit drops elements that a rerun doesn't re-emit, so the styles have
+# to be sent every run; injecting once per session would unstyle the page
+# after the first widget interaction
+st.markdown(_CSS, unsafe_allow_html=True)
+
+MODEL_UBJ_PATH = 'xgb_churn_model.ubj'
+MODEL_PKL_PATH = 'xgb_churn_model.pkl'  # Update with your model filename
 
 @st.cache_resource
 def load_model():
-    """Load the pre-trained model"""
+    """Load the pre-trained model as a native XGBoost booster"""
     try:
-        model = joblib.load('xgb_churn_model.pkl')  # Update with your model filename
-        return model
+        if os.path.exists(MODEL_UBJ_PATH):
+            # Native binary format: no unpickling or sklearn wrapper to rebuild
+            booster = xgb.Booster(model_file=MODEL_UBJ_PATH)
+        else:
+            # Inference goes through the booster directly, not the sklearn wrapper
+            booster = joblib.load(MODEL_PKL_PATH).get_booster()
     except FileNotFoundError:
-        st.error("Model file not found. Please ensure 'churn_model.pkl' is in the same directory.")
+        st.error(f"Model file not found. Please ensure '{MODEL_UBJ_PATH}' or '{MODEL_PKL_PATH}' is in the same directory.")
+        return None
+    except xgb.core.XGBoostError as e:
+        st.error(f"Model file could not be loaded: {e}")
         return None
+    if booster.feature_names is not None and tuple(booster.feature_names) != FEATURE_ORDER:
+        st.error("Model features don't match the app's feature order.")
+        return None
+    booster.set_param({'nthread': 1})
+    return booster
 
-def create_feature_vector(input_data):
-    """Create feature vector from input data matching the encoded dataset structure"""
+@st.cache_resource
+def load_batch_model():
+    """Copy of the booster that uses every core, for scoring uploaded CSVs"""
+    booster = load_model()
+    if booster is None:
+        return None
+    # The shared booster stays pinned to one thread for single-row latency
+    batch_booster = booster.copy()
+    batch_booster.set_param({'nthread': os.cpu_count() or 1})
+    return batch_booster
+
+@st.cache_resource
+def get_scoring_context():
+    """Single-row feature buffer shared by all sessions, guarded by a lock"""
+    return {
+        'buf': np.empty((1, len(FEATURE_ORDER)), dtype=np.float32),
+        'lock': threading.Lock(),
+    }
+
+@st.cache_data(max_entries=256)
+def cached_predict(input_tuple):
+    """Predict churn for a hashable tuple of inputs, reusing results across reruns"""
+    booster = load_model()
+    ctx = get_scoring_context()
+    with ctx['lock']:
+        feature_vector = ctx['buf']
+        fill_feature_vector(*input_tuple, feature_vector[0])
+        # inplace_predict skips DMatrix construction and returns P(churn) for
+        # the binary objective; the buffer has no column names to validate
+        churn_proba = float(booster.inplace_predict(feature_vector, validate_features=False)[0])
+    prediction = int(churn_proba > 0.5)
+    prediction_proba = [1 - churn_proba, churn_proba]
+    return prediction, prediction_proba
+
+# Charts are read-only, so skip the mode bar, hover/zoom handlers and re-layout on resize
+STATIC_CHART_CONFIG = {'staticPlot': True, 'displayModeBar': False, 'responsive': False}
+
+RISK_LABELS = (
+    "High age group",
+    "Zero balance",
+    "Single product",
+    "Inactive member",
+    "No credit card",
+    "Low tenure",
+    "Low credit score",
+)
+
+@st.cache_resource
+def load_plotly():
+    """Import Plotly on first prediction so the welcome screen doesn't pay for it"""
+    import plotly.graph_objects as go
+    from plotly_resampler import register_plotly_resampler
     
-    # Initialize all features with 0
-    features = {
-        'credit_score': input_data['credit_score'],
-        'gender': 1 if input_data['gender'] == 'Male' else 0,
-        'age': input_data['age'],
-        'tenure': input_data['tenure'],
-        'balance': input_data['balance'],
-        'products_number': input_data['products_number'],
-        'credit_card': 1 if input_data['credit_card'] else 0,
-        'active_member': 1 if input_data['active_member'] else 0,
-        'estimated_salary': input_data['estimated_salary'],
-        'country_Germany': 1 if input_data['country'] == 'Germany' else 0,
-        'country_Spain': 1 if input_data['country'] == 'Spain' else 0,
-        'balance_salary_ratio': input_data['balance'] / input_data['estimated_salary'] if input_data['estimated_salary'] > 0 else 0,
-        'high_balance': 1 if input_data['balance'] > 100000 else 0,  # Adjust threshold as needed
-        'active_credit_combo': 1 if (input_data['active_member'] and input_data['credit_card']) else 0,
-        'products_per_year': input_data['products_number'] / input_data['tenure'] if input_data['tenure'] > 0 else 0,
-        'age_group_31-40': 1 if 31 <= input_data['age'] <= 40 else 0,
-        'age_group_41-50': 1 if 41 <= input_data['age'] <= 50 else 0,
-        'age_group_51-60': 1 if 51 <= input_data['age'] <= 60 else 0,
-        'age_group_60+': 1 if input_data['age'] > 60 else 0,
-        'tenure_group_Medium': 1 if 3 <= input_data['tenure'] <= 7 else 0,  # Adjust ranges as needed
-        'tenure_group_High': 1 if input_data['tenure'] > 7 else 0,
+    # Downsample any large traces server-side before they reach the browser
+    register_plotly_resampler(mode='auto')
+    return go
+
+# Figures are cached as objects and never mutated after construction, so a
+# rerun with the same inputs hands Plotly an already-validated figure
+@st.cache_resource(max_entries=128, show_spinner=False)
+def _make_profile_fig(credit_score, age, tenure, products_number, balance_k, salary_k):
+    """Build the customer vs average profile chart"""
+    go = load_plotly()
+    profile_data = {
+        'Metric': np.asarray(['Credit Score', 'Age', 'Tenure', 'Products', 'Balance ($K)', 'Salary ($K)']),
+        'Value': np.asarray([credit_score, age, tenure, products_number, balance_k, salary_k]),
+        'Benchmark': np.asarray([650, 40, 5, 2, 80, 70])  # Example benchmarks
     }
     
-    return pd.DataFrame([features])
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        name='Customer',
+        x=profile_data['Metric'],
+        y=profile_data['Value'],
+        marker_color='lightblue'
+    ))
+    fig.add_trace(go.Bar(
+        name='Average',
+        x=profile_data['Metric'],
+        y=profile_data['Benchmark'],
+        marker_color='orange',
+        opacity=0.7
+    ))
+    
+    fig.update_layout(
+        title="Customer vs Average Profile",
+        barmode='group',
+        height=400
+    )
+    
+    return fig
+
+@st.cache_resource(max_entries=128, show_spinner=False)
+def _make_gauge_fig(churn_prob_pct):
+    """Build the churn probability gauge"""
+    go = load_plotly()
+    fig_gauge = go.Figure(go.Indicator(
+        mode = "gauge+number+delta",
+        value = churn_prob_pct,
+        domain = {'x': [0, 1], 'y': [0, 1]},
+        title = {'text': "Churn Probability (%)"},
+        delta = {'reference': 50},
+        gauge = {
+            'axis': {'range': [None, 100]},
+            'bar': {'color': "darkblue"},
+            'steps': [
+                {'range': [0, 25], 'color': "lightgreen"},
+                {'range': [25, 50], 'color': "yellow"},
+                {'range': [50, 75], 'color': "orange"},
+                {'range': [75, 100], 'color': "red"}
+            ],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': 80
+            }
+        }
+    ))
+    
+    fig_gauge.update_layout(height=400)
+    return fig_gauge
+
+WELCOME_MD = """
+## Welcome to the Bank Churn Prediction System
+
+This application helps predict customer churn probability using machine learning.
+
+**How to use:**
+1. Fill in the customer information in the sidebar
+2. Click "Predict Churn" to get the prediction
+3. Review the risk analysis and recommendations
+4. Or upload a CSV in the sidebar to score many customers at once
+
+**Features:**
+- Real-time churn prediction
+- Risk factor analysis
+- Customer profile visualization
+- Actionable recommendations
+"""
+
+METRIC_CARDS = (
+    ('79.6%', 'Retention Rate'),
+    ('20.4%', 'Churn Rate'),
+    ('10,000', 'Total Customers'),
+    ('21', 'Features Used'),
+)
+
+_CARDS_HTML = tuple(
+    f'<div class="metric-card"><h3>{value}</h3><p>{label}</p></div>'
+    for value, label in METRIC_CARDS
+)
 
 def main():
     # Header
@@ -104,46 +247,40 @@ def main():
     st.sidebar.header("Customer Information")
     st.sidebar.markdown("---")
     
-    # Input fields
-    col1, col2 = st.sidebar.columns(2)
-    
-    with col1:
-        credit_score = st.number_input("Credit Score", min_value=300, max_value=850, value=650, step=1)
-        age = st.number_input("Age", min_value=18, max_value=100, value=35, step=1)
-        balance = st.number_input("Account Balance ($)", min_value=0.0, value=50000.0, step=1000.0)
-        products_number = st.selectbox("Number of Products", [1, 2, 3, 4], index=1)
-        estimated_salary = st.number_input("Estimated Salary ($)", min_value=0.0, value=60000.0, step=1000.0)
-    
-    with col2:
-        gender = st.selectbox("Gender", ["Male", "Female"])
-        tenure = st.number_input("Tenure (years)", min_value=0, max_value=20, value=5, step=1)
-        country = st.selectbox("Country", ["France", "Germany", "Spain"])
-        credit_card = st.checkbox("Has Credit Card", value=True)
-        active_member = st.checkbox("Active Member", value=True)
-    
-    # Prediction button
-    if st.sidebar.button("Predict Churn", type="primary"):
+    # Input fields, batched in a form so edits don't rerun the script
+    with st.sidebar.form("predict_form"):
+        col1, col2 = st.columns(2)
         
-        # Prepare input data
-        input_data = {
-            'credit_score': credit_score,
-            'gender': gender,
-            'age': age,
-            'tenure': tenure,
-            'balance': balance,
-            'products_number': products_number,
-            'credit_card': credit_card,
-            'active_member': active_member,
-            'estimated_salary': estimated_salary,
-            'country': country
-        }
+        with col1:
+            credit_score = st.number_input("Credit Score", min_value=300, max_value=850, value=650, step=1)
+            age = st.number_input("Age", min_value=18, max_value=100, value=35, step=1)
+            balance = st.number_input("Account Balance ($)", min_value=0.0, value=50000.0, step=1000.0)
+            products_number = st.selectbox("Number of Products", [1, 2, 3, 4], index=1)
+            estimated_salary = st.number_input("Estimated Salary ($)", min_value=0.0, value=60000.0, step=1000.0)
         
-        # Create feature vector
-        feature_vector = create_feature_vector(input_data)
+        with col2:
+            gender = st.selectbox("Gender", ["Male", "Female"])
+            tenure = st.number_input("Tenure (years)", min_value=0, max_value=20, value=5, step=1)
+            country = st.selectbox("Country", ["France", "Germany", "Spain"])
+            credit_card = st.checkbox("Has Credit Card", value=True)
+            active_member = st.checkbox("Active Member", value=True)
         
-        # Make prediction
-        prediction = model.predict(feature_vector)[0]
-        prediction_proba = model.predict_proba(feature_vector)[0]
+        # Prediction button
+        submitted = st.form_submit_button("Predict Churn", type="primary")
+    
+    # Batch scoring from a CSV of raw customer columns
+    st.sidebar.markdown("---")
+    uploaded_file = st.sidebar.file_uploader("Batch Scoring (CSV)", type="csv")
+    
+    if submitted:
+        # Prepare input data, in INPUT_KEYS order
+        input_tuple = (
+            credit_score, gender, age, tenure, balance, products_number,
+            credit_card, active_member, estimated_salary, country,
+        )
+        
+        # Make prediction (cached on the input values)
+        prediction, prediction_proba = cached_predict(input_tuple)
         
         # Main content area
         col1, col2, col3 = st.columns([2, 1, 2])
@@ -168,55 +305,24 @@ def main():
             st.subheader("📊 Customer Profile")
             
             # Create customer profile chart
-            profile_data = {
-                'Metric': ['Credit Score', 'Age', 'Tenure', 'Products', 'Balance ($K)', 'Salary ($K)'],
-                'Value': [credit_score, age, tenure, products_number, balance/1000, estimated_salary/1000],
-                'Benchmark': [650, 40, 5, 2, 80, 70]  # Example benchmarks
-            }
-            
-            fig = go.Figure()
-            fig.add_trace(go.Bar(
-                name='Customer',
-                x=profile_data['Metric'],
-                y=profile_data['Value'],
-                marker_color='lightblue'
-            ))
-            fig.add_trace(go.Bar(
-                name='Average',
-                x=profile_data['Metric'],
-                y=profile_data['Benchmark'],
-                marker_color='orange',
-                opacity=0.7
-            ))
-            
-            fig.update_layout(
-                title="Customer vs Average Profile",
-                barmode='group',
-                height=400
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            fig = _make_profile_fig(credit_score, age, tenure, products_number,
+                                    balance/1000, estimated_salary/1000)
+            st.plotly_chart(fig, use_container_width=True, config=STATIC_CHART_CONFIG)
         
         with col2:
             st.subheader("🎯 Risk Factors Analysis")
             
-            # Risk factors
-            risk_factors = []
-            
-            if age > 50:
-                risk_factors.append("High age group")
-            if balance == 0:
-                risk_factors.append("Zero balance")
-            if products_number == 1:
-                risk_factors.append("Single product")
-            if not active_member:
-                risk_factors.append("Inactive member")
-            if not credit_card:
-                risk_factors.append("No credit card")
-            if tenure < 2:
-                risk_factors.append("Low tenure")
-            if credit_score < 600:
-                risk_factors.append("Low credit score")
+            # Risk factors, packed one bit per label in RISK_LABELS order
+            mask = (
+                int(age > 50) << 0
+                | int(balance == 0) << 1
+                | int(products_number == 1) << 2
+                | int(not active_member) << 3
+                | int(not credit_card) << 4
+                | int(tenure < 2) << 5
+                | int(credit_score < 600) << 6
+            )
+            risk_factors = [RISK_LABELS[i] for i in range(len(RISK_LABELS)) if mask >> i & 1]
             
             if risk_factors:
                 st.warning("**Risk Factors Identified:**")
@@ -250,65 +356,63 @@ def main():
         st.markdown("---")
         st.subheader("📈 Churn Probability Gauge")
         
-        fig_gauge = go.Figure(go.Indicator(
-            mode = "gauge+number+delta",
-            value = churn_probability,
-            domain = {'x': [0, 1], 'y': [0, 1]},
-            title = {'text': "Churn Probability (%)"},
-            delta = {'reference': 50},
-            gauge = {
-                'axis': {'range': [None, 100]},
-                'bar': {'color': "darkblue"},
-                'steps': [
-                    {'range': [0, 25], 'color': "lightgreen"},
-                    {'range': [25, 50], 'color': "yellow"},
-                    {'range': [50, 75], 'color': "orange"},
-                    {'range': [75, 100], 'color': "red"}
-                ],
-                'threshold': {
-                    'line': {'color': "red", 'width': 4},
-                    'thickness': 0.75,
-                    'value': 80
-                }
-            }
-        ))
-        
-        fig_gauge.update_layout(height=400)
-        st.plotly_chart(fig_gauge, use_container_width=True)
+        fig_gauge = _make_gauge_fig(churn_probability)
+        st.plotly_chart(fig_gauge, use_container_width=True, config=STATIC_CHART_CONFIG)
     
-    else:
-        # Welcome message
-        st.markdown("""
-        ## Welcome to the Bank Churn Prediction System
-        
-        This application helps predict customer churn probability using machine learning.
-        
-        **How to use:**
-        1. Fill in the customer information in the sidebar
-        2. Click "Predict Churn" to get the prediction
-        3. Review the risk analysis and recommendations
+    elif uploaded_file is not None:
+        st.subheader("📋 Batch Predictions")
         
-        **Features:**
-        - Real-time churn prediction
-        - Risk factor analysis
-        - Customer profile visualization
-        - Actionable recommendations
-        """)
+        try:
+            batch_df = pd.read_csv(uploaded_file)
+        except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError, ValueError) as e:
+            st.error(f"Could not read the uploaded CSV: {e}")
+            st.stop()
+        missing = [key for key in INPUT_KEYS if key not in batch_df.columns]
+        if missing:
+            st.error(f"CSV is missing required columns: {', '.join(missing)}")
+            st.stop()
         
-        # Sample statistics
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.markdown('<div class="metric-card"><h3>79.6%</h3><p>Retention Rate</p></div>', unsafe_allow_html=True)
+        batch_df, problems = clean_batch(batch_df)
+        for problem in problems:
+            st.warning(f"Skipped rows: {problem}")
+        if batch_df.empty:
+            st.error("No valid rows to score.")
+            st.stop()
         
-        with col2:
-            st.markdown('<div class="metric-card"><h3>20.4%</h3><p>Churn Rate</p></div>', unsafe_allow_html=True)
+        # One vectorized predict over the whole (N, 21) matrix
+        feature_matrix = create_feature_matrix(batch_df)
+        churn_proba = load_batch_model().inplace_predict(feature_matrix, validate_features=False)
         
-        with col3:
-            st.markdown('<div class="metric-card"><h3>10,000</h3><p>Total Customers</p></div>', unsafe_allow_html=True)
+        results = batch_df.assign(
+            churn_probability=np.round(churn_proba * 100, 1),
+            prediction=(churn_proba > 0.5).astype(int),
+        )
+        st.dataframe(results, use_container_width=True)
+    
+    else:
+        # Welcome message
+        st.markdown(WELCOME_MD)
         
-        with col4:
-            st.markdown('<div class="metric-card"><h3>21</h3><p>Features Used</p></div>', unsafe_allow_html=True)
+        # Sample statistics
+        for card_html, col in zip(_CARDS_HTML, st.columns(len(_CARDS_HTML))):
+            col.markdown(card_html, unsafe_allow_html=True)
+
+def profiled_main(path):
+    """Run main() under cProfile and write the stats for this rerun to path"""
+    import cProfile
+    
+    # Streamlit runs the script on its own thread, which a profiler started
+    # around `streamlit run` never sees, so profile from inside the script
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        main()
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
 
 if __name__ == "__main__":
-    main()
+    if os.environ.get('CHURN_PROFILE'):
+        profiled_main(os.environ['CHURN_PROFILE'])
+    else:
+        main()
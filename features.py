@@ -0,0 +1,181 @@
+"""Feature engineering shared by single-row and batch churn scoring.
+
+Kept out of app.py so it is imported (and the Numba kernel compiled) once per
+process instead of on every Streamlit rerun.
+"""
+import threading
+from bisect import bisect_right
+import numpy as np
+import pandas as pd
+from numba import njit, prange
+
+# Order of the raw sidebar inputs, used to key the prediction cache
+INPUT_KEYS = (
+    'credit_score', 'gender', 'age', 'tenure', 'balance', 'products_number',
+    'credit_card', 'active_member', 'estimated_salary', 'country',
+)
+
+# Lower bin edges for the age and tenure groups (whole years): a bisect_right
+# code of k means the value falls in group k, 0 being the unencoded group
+AGE_EDGES = (31, 41, 51, 61)
+TENURE_EDGES = (3, 8)  # Adjust ranges as needed
+
+# Each model feature as an expression over INPUT_KEYS and the age/tenure bins, in the column order the
+# model was trained on (matches final_encoded_bank_churn.csv)
+_FEATURE_SPEC = (
+    ('credit_score', "credit_score"),
+    ('gender', "gender == 'Male'"),
+    ('age', "age"),
+    ('tenure', "tenure"),
+    ('balance', "balance"),
+    ('products_number', "products_number"),
+    ('credit_card', "credit_card"),
+    ('active_member', "active_member"),
+    ('estimated_salary', "estimated_salary"),
+    ('country_Germany', "country == 'Germany'"),
+    ('country_Spain', "country == 'Spain'"),
+    # Branchless ratios: a non-positive denominator is replaced by 1 and the result masked to 0
+    ('balance_salary_ratio', "(estimated_salary > 0) * balance / (estimated_salary * (estimated_salary > 0) + (estimated_salary <= 0))"),
+    ('high_balance', "balance > 100000"),  # Adjust threshold as needed
+    ('active_credit_combo', "active_member and credit_card"),
+    ('products_per_year', "(tenure > 0) * products_number / (tenure * (tenure > 0) + (tenure <= 0))"),
+    ('age_group_31-40', "age_bin == 1"),
+    ('age_group_41-50', "age_bin == 2"),
+    ('age_group_51-60', "age_bin == 3"),
+    ('age_group_60+', "age_bin == 4"),
+    ('tenure_group_Medium', "tenure_bin == 1"),
+    ('tenure_group_High', "tenure_bin == 2"),
+)
+
+FEATURE_ORDER = tuple(name for name, _ in _FEATURE_SPEC)
+
+def _compile_feature_filler():
+    """Generate a function specialized to the fixed schema that writes one feature row"""
+    lines = [
+        f"def fill_feature_vector({', '.join(INPUT_KEYS)}, out):",
+        "    age_bin = bisect_right(AGE_EDGES, age)",
+        "    tenure_bin = bisect_right(TENURE_EDGES, tenure)",
+    ]
+    lines += [f"    out[{i}] = {expr}" for i, (_, expr) in enumerate(_FEATURE_SPEC)]
+    namespace = {'bisect_right': bisect_right, 'AGE_EDGES': AGE_EDGES, 'TENURE_EDGES': TENURE_EDGES}
+    exec('\n'.join(lines), namespace)
+    return namespace['fill_feature_vector']
+
+# fill_feature_vector(*inputs in INPUT_KEYS order, out=row of a (1, 21) buffer)
+fill_feature_vector = _compile_feature_filler()
+
+@njit(parallel=True, fastmath=True, cache=True)
+def build_features(cs, g, age, ten, bal, pn, cc, am, es, country_code, out):
+    """Batch feature kernel: write columns 0-14 of one FEATURE_ORDER row per customer into out"""
+    for i in prange(cs.shape[0]):
+        out[i, 0] = cs[i]
+        out[i, 1] = g[i]
+        out[i, 2] = age[i]
+        out[i, 3] = ten[i]
+        out[i, 4] = bal[i]
+        out[i, 5] = pn[i]
+        out[i, 6] = cc[i]
+        out[i, 7] = am[i]
+        out[i, 8] = es[i]
+        out[i, 9] = 1.0 if country_code[i] == 1 else 0.0
+        out[i, 10] = 1.0 if country_code[i] == 2 else 0.0
+        # Branchless ratios so the loop can vectorize; non-positive denominators yield 0
+        out[i, 11] = (es[i] > 0) * bal[i] / (es[i] * (es[i] > 0) + (es[i] <= 0))
+        out[i, 12] = 1.0 if bal[i] > 100000 else 0.0
+        out[i, 13] = am[i] * cc[i]
+        out[i, 14] = (ten[i] > 0) * pn[i] / (ten[i] * (ten[i] > 0) + (ten[i] <= 0))
+
+# Streamlit runs each session on its own thread, and Numba's default
+# workqueue threading layer aborts the process on concurrent parallel calls
+_KERNEL_LOCK = threading.Lock()
+
+COUNTRY_CODES = {'France': 0, 'Germany': 1, 'Spain': 2}
+GENDERS = ('Male', 'Female')
+
+_BOOL_STRINGS = {'True': 1, 'TRUE': 1, 'true': 1, 'False': 0, 'FALSE': 0, 'false': 0}
+
+_NUMERIC_KEYS = tuple(key for key in INPUT_KEYS if key not in ('gender', 'country'))
+
+def clean_batch(df):
+    """Coerce raw customer columns to numbers and drop rows that can't be scored
+    
+    Returns the remaining rows and one message per column that had rejected rows
+    (row numbers count data rows from 1).
+    """
+    df = df.copy()
+    invalid = np.zeros(len(df), dtype=bool)
+    problems = []
+    
+    def reject(key, bad, reason):
+        bad = np.asarray(bad, dtype=bool)
+        if bad.any():
+            rows = np.flatnonzero(bad) + 1
+            shown = ', '.join(str(row) for row in rows[:10])
+            more = ', ...' if len(rows) > 10 else ''
+            problems.append(f"'{key}' {reason} in row(s) {shown}{more}")
+        return invalid | bad
+    
+    for key in _NUMERIC_KEYS:
+        values = df[key]
+        if pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            # A stray bad cell makes pandas read a True/False column as strings
+            values = values.astype(object).replace(_BOOL_STRINGS)
+        df[key] = pd.to_numeric(values, errors='coerce')
+        invalid = reject(key, df[key].isna(), "is missing or not numeric")
+    
+    # The age/tenure groups were trained on whole years; binning a fractional
+    # value against the lower edges would encode it differently
+    for key in ('age', 'tenure'):
+        values = df[key]
+        invalid = reject(key, values.notna() & ((values % 1 != 0) | (values < 0)),
+                         "is not a whole, non-negative number of years")
+    
+    invalid = reject('gender', ~df['gender'].isin(GENDERS),
+                     f"is not one of {', '.join(GENDERS)}")
+    invalid = reject('country', ~df['country'].isin(tuple(COUNTRY_CODES)),
+                     f"is not one of {', '.join(COUNTRY_CODES)}")
+    
+    return df[~invalid], problems
+
+def create_feature_matrix(df):
+    """Create an (N, 21) feature matrix from raw customer columns via the Numba kernel
+    
+    Expects rows that have been through clean_batch.
+    """
+    
+    country_code = df['country'].map(COUNTRY_CODES)
+    if country_code.isna().any():
+        raise ValueError("Unknown country in batch rows; filter them with clean_batch first")
+    
+    def col(values):
+        return np.ascontiguousarray(values, dtype=np.float64)
+    
+    age = col(df['age'])
+    tenure = col(df['tenure'])
+    
+    out = np.empty((len(df), len(FEATURE_ORDER)), dtype=np.float32)
+    with _KERNEL_LOCK:
+        build_features(
+            col(df['credit_score']),
+            col(df['gender'] == 'Male'),
+            age,
+            tenure,
+            col(df['balance']),
+            col(df['products_number']),
+            col(df['credit_card']),
+            col(df['active_member']),
+            col(df['estimated_salary']),
+            col(country_code),
+            out,
+        )
+    
+    # Age/tenure group one-hots from a single bucketizing pass per column
+    age_bin = np.searchsorted(AGE_EDGES, age, side='right')
+    tenure_bin = np.searchsorted(TENURE_EDGES, tenure, side='right')
+    out[:, 15:19] = age_bin[:, None] == np.arange(1, len(AGE_EDGES) + 1)
+    out[:, 19:21] = tenure_bin[:, None] == np.arange(1, len(TENURE_EDGES) + 1)
+    return out
+
+# Compile the kernel at import so the first batch request doesn't pay for it
+_warmup = np.zeros(1)
+build_features(*([_warmup] * 10), np.empty((1, len(FEATURE_ORDER)), dtype=np.float32))
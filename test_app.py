@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("numba")
+pytest.importorskip("streamlit")
+joblib = pytest.importorskip("joblib")
+pytest.importorskip("xgboost")
+
+from test_features import _random_customers
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_native_model_matches_pickle(monkeypatch):
+    monkeypatch.chdir(REPO_DIR)
+    import app
+    from features import create_feature_matrix
+    
+    assert os.path.exists(app.MODEL_UBJ_PATH)
+    native = app.load_model()
+    pickled = joblib.load(app.MODEL_PKL_PATH).get_booster()
+    
+    assert tuple(native.feature_names) == app.FEATURE_ORDER
+    X = create_feature_matrix(_random_customers(n=1000))
+    np.testing.assert_allclose(
+        native.inplace_predict(X, validate_features=False),
+        pickled.inplace_predict(X, validate_features=False),
+        rtol=1e-6,
+    )
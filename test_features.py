@@ -0,0 +1,75 @@
+import io
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("numba")
+
+from features import (
+    FEATURE_ORDER, INPUT_KEYS, clean_batch, create_feature_matrix, fill_feature_vector,
+)
+
+MODEL_PKL_PATH = os.path.join(os.path.dirname(__file__), 'xgb_churn_model.pkl')
+
+
+def _random_customers(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'credit_score': rng.integers(300, 851, n),
+        'gender': rng.choice(['Male', 'Female'], n),
+        'age': rng.integers(18, 101, n),
+        'tenure': rng.integers(0, 21, n),
+        'balance': np.round(rng.uniform(0, 250000, n), 2),
+        'products_number': rng.integers(1, 5, n),
+        'credit_card': rng.integers(0, 2, n),
+        'active_member': rng.integers(0, 2, n),
+        'estimated_salary': np.round(rng.uniform(0, 200000, n), 2),
+        'country': rng.choice(['France', 'Germany', 'Spain'], n),
+    })
+    return df
+
+
+def test_single_row_and_batch_features_match():
+    df = _random_customers()
+    # Ratio edge cases: zero and negative denominators, zero balance
+    df.loc[:9, 'estimated_salary'] = [0, -1, -0.5, 0, -1, 0.5, 1, 0, -2, 0]
+    df.loc[:9, 'tenure'] = [0, -1, 0, 1, -1, 0, 2, -1, 0, 3]
+    df.loc[:4, 'balance'] = 0
+    
+    expected = np.empty((len(df), len(FEATURE_ORDER)), dtype=np.float32)
+    for i, row in enumerate(df[list(INPUT_KEYS)].itertuples(index=False)):
+        fill_feature_vector(*row, expected[i])
+    
+    actual = create_feature_matrix(df)
+    
+    assert np.isfinite(actual).all()
+    np.testing.assert_allclose(actual, expected, rtol=1e-6)
+
+
+def test_feature_order_matches_model():
+    joblib = pytest.importorskip("joblib")
+    pytest.importorskip("xgboost")
+    
+    booster = joblib.load(MODEL_PKL_PATH).get_booster()
+    
+    assert tuple(booster.feature_names) == FEATURE_ORDER
+
+
+def test_clean_batch_rejects_unscorable_rows():
+    csv = "\n".join([
+        ",".join(INPUT_KEYS),
+        "650,Male,35,5,50000.0,2,True,True,60000.0,France",
+        "700,Female,45,3,0.0,1,True,False,80000.0,Germany",
+        "600,Male,52,8,120000.0,3,True,True,90000.0,Frnace",
+        "640,Female,29,1,1000.0,1,yes,True,40000.0,Spain",
+        "610,Male,60.5,7.5,5000.0,2,True,True,70000.0,France",
+    ])
+    df = pd.read_csv(io.StringIO(csv))
+    
+    cleaned, problems = clean_batch(df)
+    
+    assert list(cleaned.index) == [0, 1]
+    assert cleaned['credit_card'].tolist() == [1, 1]
+    assert len(problems) == 4